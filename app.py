@@ -1,7 +1,12 @@
+import bisect
 import random
-import re
-from typing import List, Set
+import string
+import threading
+from typing import Callable, List, Set, Tuple
 
+import marisa_trie
+import numpy as np
+from numba import njit
 import streamlit as st
 from wordfreq import top_n_list
 import streamlit.components.v1 as components
@@ -19,11 +24,79 @@ SEEDS = [
     "QUANTUM", "RESCUE", "SEASONS", "THOUGHT", "WONDER"
 ]
 
+# seeds that yield exactly 7 unique letters, filtered once at import
+SEEDS_7 = [s for s in SEEDS if len(set(s)) == 7]
+assert SEEDS_7, "SEEDS must contain at least one word with 7 unique letters"
+
 # public applause sound (autoplayed via HTML audio tag)
 APPLAUSE_URL = "https://actions.google.com/sounds/v1/people/applause.ogg"
 
-
-@st.cache_data
+# single stylesheet for the dark theme, letter ring and highlighted buttons
+_CSS = """
+<style>
+/* Dark theme: black background, white text */
+html, body, .stApp {
+  height: 100%;
+  background: #000000 !important;
+  color: #ffffff !important;
+}
+
+/* Dark translucent UI container for contrast */
+.block-container {
+  background: rgba(0,0,0,0.6) !important;
+  border-radius: 12px;
+  padding: 1.5rem 2rem;
+  box-shadow: 0 8px 24px rgba(0,0,0,0.12);
+}
+
+/* Default letter/button appearance: dark surface with white text */
+.stButton>button {
+  background: linear-gradient(180deg, #111827, #0b1220) !important;
+  color: #ffffff;
+  border: 1px solid rgba(255,255,255,0.04) !important;
+  box-shadow: 0 8px 20px rgba(0,0,0,0.6) !important;
+  border-radius: 12px !important;
+  min-width: 64px !important;
+  height: 64px !important;
+  font-size: 22px !important;
+  padding: 0 12px !important;
+  font-weight: 700;
+  cursor: pointer;
+  transition: transform 0.12s ease, box-shadow 0.12s ease, background 0.12s ease;
+}
+.stButton>button:hover { transform: translateY(-3px); }
+.stButton>button:active { transform: translateY(0); }
+
+/* Make letter buttons larger and circular (scoped by the keyed ring container) */
+.st-key-letter_ring .stButton>button {
+  width: 84px !important;
+  height: 84px !important;
+  border-radius: 50% !important;
+  font-size: 28px !important;
+  padding: 0 !important;
+}
+.st-key-letter_center .stButton>button {
+  width: 110px !important;
+  height: 110px !important;
+  font-size: 36px !important;
+  border-radius: 50% !important;
+}
+
+/* Mandatory center letter: ensure button and its contents are red and bold */
+.st-key-letter_center .stButton>button, .st-key-letter_center .stButton>button * { color: #ff3b30 !important; font-weight: 900 !important; }
+.st-key-letter_center .stButton>button { background: linear-gradient(180deg, #fff6ea, #ffd89b) !important; border-color: rgba(255,59,48,0.12) !important; }
+
+/* Submit and New Game buttons: red and bold */
+.st-key-submit_btn .stButton>button, .st-key-submit_btn .stButton>button *,
+.st-key-new_game_btn .stButton>button, .st-key-new_game_btn .stButton>button * {
+  color: #ff3b30 !important; font-weight: 800 !important;
+}
+.st-key-submit_btn .stButton>button, .st-key-new_game_btn .stButton>button { border-color: #ff3b30 !important; }
+</style>
+"""
+
+
+@st.cache_resource
 def load_wordlist(n: int = 200000) -> List[str]:
     """
     Load a large list of English words from wordfreq.
@@ -32,57 +105,122 @@ def load_wordlist(n: int = 200000) -> List[str]:
     return top_n_list("en", n)
 
 
+class _KeepUppercase(dict):
+    """str.translate table that keeps A-Z and deletes every other code point."""
+
+    def __missing__(self, key: int):
+        # any code point outside A-Z, including non-ASCII ones from upper(), maps to deletion
+        return None
+
+
+_TABLE = _KeepUppercase((ord(c), ord(c)) for c in string.ascii_uppercase)
+
+
 def normalize(word: str) -> str:
-    return re.sub(r"[^A-Z]", "", word.upper())
-
-
-def generate_valid_words(letters: Set[str], mandatory: str, wordlist: List[str]) -> List[str]:
-    letters_set = set(letters)
-    valid = []
-    for w in wordlist:
-        # wordfreq words are lowercase; normalize to uppercase letters only
-        word = normalize(w)
-        if len(word) < 3:
-            continue
-        if mandatory not in word:
-            continue
-        if set(word) - letters_set:
-            continue
-        valid.append(word)
-    # dedupe and sort
-    valid = sorted(set(valid))
-    return valid
+    return word.upper().translate(_TABLE)
+
+
+def letter_mask(word: str) -> int:
+    """Return a 26-bit mask with one bit set per distinct letter A-Z in ``word``."""
+    mask = 0
+    for c in word:
+        mask |= 1 << (ord(c) - 65)
+    return mask
+
+
+@st.cache_resource
+def _normalized_words() -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Uppercase the wordlist once and compute each word's letter mask and length.
+    Words containing anything other than A-Z are dropped up front, and the
+    result is deduplicated and sorted so filtered slices come out in order.
+    """
+    uppercased = (w.upper() for w in load_wordlist())
+    words = sorted({word for word in uppercased if word.isascii() and word.isalpha()})
+    masks = [letter_mask(word) for word in words]
+    lens = np.fromiter(map(len, words), dtype=np.uint8, count=len(words))
+    return words, np.array(masks, dtype=np.uint32), lens
+
+
+@st.cache_resource
+def _word_trie() -> marisa_trie.Trie:
+    """Compact trie of every normalized word, built once per process."""
+    words, _, _ = _normalized_words()
+    return marisa_trie.Trie(words)
+
+
+def _filter(masks: np.ndarray, lens: np.ndarray, allowed: np.uint32, mbit: np.uint32, out: np.ndarray) -> None:
+    # subset test: no letters outside the ring, and the mandatory letter present
+    for i in range(masks.size):
+        out[i] = (lens[i] >= 3) & ((masks[i] & ~allowed) == 0) & ((masks[i] & mbit) != 0)
+
+
+@st.cache_resource
+def _compiled_filter() -> Callable[..., None]:
+    """
+    Compile _filter once per process. Streamlit re-executes this script on every
+    rerun, so a module-level @njit would hand each rerun a fresh, uncompiled dispatcher.
+    """
+    return njit("void(uint32[:], uint8[:], uint32, uint32, boolean[:])")(_filter)
+
+
+def generate_valid_words(
+    letters: Set[str], mandatory: str, words: List[str], masks: np.ndarray, lens: np.ndarray
+) -> List[str]:
+    allowed = np.uint32(letter_mask(letters))
+    mbit = np.uint32(letter_mask(mandatory))
+    out = np.empty(masks.size, dtype=np.bool_)
+    _compiled_filter()(masks, lens, allowed, mbit, out)
+    # words are unique and sorted at build time, so the selection is too
+    return [words[i] for i in np.flatnonzero(out)]
+
+
+@st.cache_data
+def _valid_for(letters_frozen: frozenset, mandatory: str) -> List[str]:
+    """Valid words for a letter set, cached so repeated letter sets are free."""
+    words, masks, lens = _normalized_words()
+    return generate_valid_words(set(letters_frozen), mandatory, words, masks, lens)
+
+
+def _warmup() -> None:
+    _word_trie()
+    _compiled_filter()
+
+
+@st.cache_resource(show_spinner=False)
+def _start_warmup() -> threading.Thread:
+    """Build the word tables and compile the mask filter on a background thread, once per process."""
+    thread = threading.Thread(target=_warmup, daemon=True)
+    thread.start()
+    return thread
+
+
+# start loading words at import so the first New Game does not block on wordfreq
+_start_warmup()
 
 
 def start_new_game():
-    # pick a seed that yields 7 unique letters when possible
-    seed = random.choice(SEEDS)
-    attempts = 0
-    while len(set(seed)) != 7 and attempts < 50:
-        seed = random.choice(SEEDS)
-        attempts += 1
+    seed = random.choice(SEEDS_7)
     # extract unique letters from the seed preserving order
     letters = list(dict.fromkeys(seed))
-    # If we still don't have 7 unique letters (rare), pad with random letters
-    if len(letters) != 7:
-        import string
-
-        extra = [c for c in string.ascii_uppercase if c not in letters]
-        random.shuffle(extra)
-        letters.extend(extra[: (7 - len(letters))])
     random.shuffle(letters)  # present letters in a jumbled order
     mandatory = random.choice(letters)
-    wordlist = load_wordlist()
-    valid = generate_valid_words(set(letters), mandatory, wordlist)
-    # also store a fast lookup set of all normalized words from the source wordlist
-    wordset = {normalize(w) for w in wordlist}
+    valid = _valid_for(frozenset(letters), mandatory)
+    # pangrams use every ring letter, i.e. their mask equals the ring mask
+    allowed_mask = letter_mask(letters)
+    pangrams_all = [w for w in valid if is_pangram_mask(letter_mask(w), allowed_mask)]
     st.session_state.update(
         seed=seed,
         letters=letters,
         mandatory=mandatory,
         valid_words=valid,
-        wordset=wordset,
+        allowed_mask=allowed_mask,
+        mbit=letter_mask(mandatory),
+        pangrams_all=pangrams_all,
         found=[],
+        found_set=set(),
+        found_sorted=[],
+        found_masks=[],
         score=0,
         guess_input="",
         show_pangram=False,
@@ -94,27 +232,29 @@ def append_letter(letter: str):
 
 
 def handle_submit():
-    guess = st.session_state.get("guess_input", "").strip().upper()
+    # Only ever invoked as a widget callback, which runs before the text_input is
+    # rebuilt, so the value can be read once and cleared without a widget-state clash.
+    guess = st.session_state["guess_input"].strip().upper()
     st.session_state["guess_input"] = ""
     if not guess:
         return
     # normalize and validate
     guess_norm = normalize(guess)
-    if guess_norm in st.session_state["found"]:
+    if guess_norm in st.session_state["found_set"]:
         st.warning(f"Already found: {guess_norm}")
         return
-    # validate against source wordset and letter constraints
-    if "wordset" not in st.session_state:
-        st.error("Word database not loaded.")
-        return
-    if guess_norm not in st.session_state["wordset"]:
+    # validate against the shared word trie and letter constraints
+    if guess_norm not in _word_trie():
         st.error(f"Not a recognized word: {guess_norm}")
         return
-    letters_set = set(st.session_state["letters"])
-    if len(guess_norm) < 3 or set(guess_norm) - letters_set or st.session_state["mandatory"] not in guess_norm:
+    gmask = letter_mask(guess_norm)
+    if len(guess_norm) < 3 or (gmask & ~st.session_state["allowed_mask"]) or not (gmask & st.session_state["mbit"]):
         st.error(f"Not valid: {guess_norm}")
         return
     st.session_state["found"].append(guess_norm)
+    st.session_state["found_set"].add(guess_norm)
+    bisect.insort(st.session_state["found_sorted"], guess_norm)
+    st.session_state["found_masks"].append(gmask)
     # simple scoring: +len(word)
     points = len(guess_norm)
     bonus = 0
@@ -135,103 +275,15 @@ def handle_submit():
         components.html(f"<audio autoplay><source src='{APPLAUSE_URL}' type='audio/ogg'></audio>", height=10)
 
 
-def is_pangram(word: str, letters_set: Set[str]) -> bool:
-    return set(word) >= letters_set
+def is_pangram_mask(word_mask: int, allowed_mask: int) -> bool:
+    return word_mask == allowed_mask
 
 
 def main():
     st.set_page_config(page_title="LetterRing", layout="centered")
-    # background and container styling
-    st.markdown(
-        """
-        <style>
-        html, body, .stApp {
-          height: 100%;
-          background: radial-gradient(circle at 10% 20%, #fef3c7, rgba(255,255,255,0) 20%),
-                      linear-gradient(135deg, #f6d365 0%, #fda085 100%);
-          background-attachment: fixed;
-        }
-        .block-container {
-          background: rgba(255,255,255,0.78);
-          border-radius: 12px;
-          padding: 1.5rem 2rem;
-          box-shadow: 0 8px 24px rgba(0,0,0,0.12);
-        }
-        /* Make Streamlit buttons look more clickable and tactile */
-        .stButton>button {
-          background: linear-gradient(180deg, #ffffff, #f3f4f6);
-          border: 1px solid rgba(15, 23, 42, 0.06);
-          color: #0f172a;
-          padding: 10px 14px;
-          border-radius: 12px;
-          cursor: pointer;
-          box-shadow: 0 8px 18px rgba(2,6,23,0.08);
-          transition: transform 0.12s ease, box-shadow 0.12s ease, background 0.12s ease;
-          min-width: 72px;
-          height: 52px;
-          font-weight: 700;
-        }
-        .stButton>button:hover {
-          transform: translateY(-3px);
-          box-shadow: 0 14px 30px rgba(2,6,23,0.12);
-        }
-        .stButton>button:active {
-          transform: translateY(0);
-          box-shadow: 0 6px 14px rgba(2,6,23,0.06);
-        }
-        </style>
-        """,
-        unsafe_allow_html=True,
-    )
+    st.markdown(_CSS, unsafe_allow_html=True)
     st.title("LetterRing")
 
-    st.markdown("""
-    <style>
-    /* Dark theme: black background, white text */
-    html, body, .stApp {
-      background: #000000 !important;
-      color: #ffffff !important;
-    }
-
-    /* Default letter/button appearance: dark surface with white text */
-    .stButton>button {
-      background: linear-gradient(180deg, #111827, #0b1220) !important;
-      color: #ffffff;
-      border: 1px solid rgba(255,255,255,0.04) !important;
-      box-shadow: 0 8px 20px rgba(0,0,0,0.6) !important;
-      border-radius: 12px !important;
-      min-width: 64px !important;
-      height: 64px !important;
-      font-size: 22px !important;
-      padding: 0 12px !important;
-    }
-
-    /* Make primary letter buttons larger and circular via class applied below */
-    .letter-btn {
-      width: 84px !important;
-      height: 84px !important;
-      border-radius: 50% !important;
-      font-size: 28px !important;
-      padding: 0 !important;
-    }
-    .letter-center-btn {
-      width: 110px !important;
-      height: 110px !important;
-      font-size: 36px !important;
-      border-radius: 50% !important;
-    }
-
-    /* Mandatory center letter: ensure button and its contents are red and bold */
-    .letter-center, .letter-center a { color: #ff3b30 !important; font-weight: 900 !important; }
-    .letter-center-btn, .letter-center-btn * { color: #ff3b30 !important; font-weight: 900 !important; }
-    .letter-center-btn { background: linear-gradient(180deg, #fff6ea, #ffd89b) !important; border-color: rgba(255,59,48,0.12) !important; }
-
-    /* Dark translucent UI container for contrast */
-    .block-container { background: rgba(0,0,0,0.6) !important; }
-    </style>
-    """, unsafe_allow_html=True)
-
-
     # Use native Streamlit buttons for letters (avoids full-page navigation)
 
     if "letters" not in st.session_state:
@@ -253,92 +305,18 @@ def main():
         else:
             display.append(next(other_iter))
 
-    # Render letters as native Streamlit buttons in columns so clicks are handled server-side
-    cols = st.columns(len(display))
-    for i, L in enumerate(display):
-        with cols[i]:
-            btn_key = f"letter_{i}"
-            clicked = st.button(L, key=btn_key, on_click=append_letter, args=(L,))
-
-    # Single client-side script to style letter buttons (make them circular) and
-    # mark the mandatory center letter red & bold.
-    components.html(
-        f"""
-        <script>
-        (function(){{
-          const mandatory = "{mandatory}";
-          function styleLetters() {{
-            const buttons = Array.from(document.querySelectorAll('button'));
-            for (const b of buttons) {{
-              const txt = (b.textContent || '').trim();
-              // consider as letter button if text is a single uppercase letter A-Z
-              if (/^[A-Z]$/.test(txt)) {{
-                b.classList.add('letter-btn');
-                // ensure shape/size
-                b.style.width = '84px';
-                b.style.height = '84px';
-                b.style.borderRadius = '50%';
-                b.style.fontSize = '28px';
-                b.style.padding = '0';
-                b.style.lineHeight = '84px';
-                if (txt === mandatory) {{
-                  b.classList.add('letter-center-btn');
-                  b.style.color = '#ff3b30';
-                  b.style.fontWeight = '900';
-                  // also try to color inner elements
-                  try {{ const inner = b.querySelector('*'); if (inner) {{ inner.style.color = '#ff3b30'; inner.style.fontWeight='900'; }} }} catch(e){{}}
-                }} else {{
-                  b.style.color = '#ffffff';
-                  try {{ const inner = b.querySelector('*'); if (inner) {{ inner.style.color = '#ffffff'; }} }} catch(e){{}}
-                }}
-              }}
-            }}
-          }}
-          styleLetters();
-          const mo = new MutationObserver(styleLetters);
-          mo.observe(document.body, {{ childList: true, subtree: true }});
-          // run a few times to handle late renders
-          let runs = 0;
-          const iv = setInterval(function(){{ styleLetters(); runs++; if (runs>20) clearInterval(iv); }}, 150);
-        }})();
-        </script>
-        """,
-        height=0,
-    )
-
-    # Extra script: ensure the mandatory (center) letter is styled red by directly setting inline styles
-    components.html(
-        """
-        <script>
-        (function(){
-          const centerLabel = `%s`;
-          function styleCenter(){
-            const buttons = Array.from(document.querySelectorAll('button'));
-            for (const b of buttons){
-              try {
-                const aria = (b.getAttribute('aria-label') || '').toLowerCase();
-                const text = (b.textContent || '').trim();
-                // match by exact text, inclusion, or aria-label containing the center label
-                if (text === centerLabel || text.includes(centerLabel) || aria.includes(centerLabel.toLowerCase())) {
-                  b.style.color = '#ff3b30';
-                  b.style.fontWeight = '900';
-                  b.style.borderColor = '#ff3b30';
-                  const inner = b.querySelector('*');
-                  if (inner) { inner.style.color = '#ff3b30'; inner.style.fontWeight = '900'; }
-                  return;
-                }
-              } catch(e){}
-            }
-          }
-          styleCenter();
-          const mo = new MutationObserver(styleCenter);
-          mo.observe(document.body, { childList: true, subtree: true });
-          setInterval(styleCenter, 250);
-        })();
-        </script>
-        """ % (mandatory),
-        height=0,
-    )
+    # Render letters as native Streamlit buttons in columns so clicks are handled server-side.
+    # Keyed containers get an ``st-key-<key>`` class, which the stylesheet uses to shape the ring.
+    with st.container(key="letter_ring"):
+        cols = st.columns(len(display))
+        for i, L in enumerate(display):
+            with cols[i]:
+                btn_key = f"letter_{i}"
+                if i == mid:
+                    with st.container(key="letter_center"):
+                        st.button(L, key=btn_key, on_click=append_letter, args=(L,))
+                else:
+                    st.button(L, key=btn_key, on_click=append_letter, args=(L,))
 
     # Visible mandatory letter indicator (always red and bold)
     st.markdown(
@@ -348,7 +326,7 @@ def main():
 
     # New Game and Shuffle controls
     col_a, col_b = st.columns(2)
-    with col_a:
+    with col_a, st.container(key="new_game_btn"):
         if st.button("New Game"):
             start_new_game()
     with col_b:
@@ -369,44 +347,12 @@ def main():
 
     st.markdown("Enter guesses below (minimum length 3, must include the highlighted letter).")
     # Submit when the user presses Enter by using on_change callback
-    st.text_input("Your guess", key="guess_input", placeholder="Type a word and press Submit", on_change=handle_submit)
-    st.button("Submit", on_click=handle_submit)
-
-    # Make the "Submit" and "New Game" buttons' text red and bold via small DOM script.
-    components.html(
-        """
-        <script>
-        (function(){
-          const CSS = `.lr-red-btn { color: #ff3b30 !important; font-weight: 800 !important; border-color: #ff3b30 !important; }`;
-          const style = document.createElement('style');
-          style.appendChild(document.createTextNode(CSS));
-          document.head.appendChild(style);
-
-          function markButtons(){
-            document.querySelectorAll('button').forEach(function(b){
-              const text = (b.textContent || '').trim().toLowerCase();
-              if (text.includes('submit') || text.includes('new game')) {
-                b.classList.add('lr-red-btn');
-              }
-            });
-          }
-
-          // run periodically to catch Streamlit re-renders
-          markButtons();
-          const mo = new MutationObserver(markButtons);
-          mo.observe(document.body, { childList: true, subtree: true });
-          // also run on interval briefly to be safe
-          let runs = 0;
-          const iv = setInterval(function(){
-            markButtons();
-            runs += 1;
-            if (runs > 20) { clearInterval(iv); }
-          }, 200);
-        })();
-        </script>
-        """,
-        height=0,
-    )
+    st.text_input("Your guess", key="guess_input", placeholder="Type a word and press Enter", on_change=handle_submit)
+    # Letter-button input changes the value programmatically and never fires on_change,
+    # so Submit stays as the second entry point into the same callback.
+    with st.container(key="submit_btn"):
+        st.button("Submit", on_click=handle_submit)
+
 
     st.divider()
     found = st.session_state.get("found", [])
@@ -415,19 +361,20 @@ def main():
     st.write(f"Words found: {len(found)}")
 
     # show pangram if any found
-    letters_set = set(st.session_state["letters"])
-    pangrams = [w for w in found if is_pangram(w, letters_set)]
+    allowed_mask = st.session_state["allowed_mask"]
+    found_masks = st.session_state.get("found_masks", [])
+    pangrams = [w for w, m in zip(found, found_masks) if is_pangram_mask(m, allowed_mask)]
     if pangrams:
         st.success(f"Pangram found: {', '.join(pangrams)} 🎉")
 
-    st.expander("Found words").write(sorted(found))
+    st.expander("Found words").write(st.session_state.get("found_sorted", []))
 
     # Button to reveal pangrams (words that use all 7 letters)
     if st.button("Show Pangrams"):
         st.session_state["show_pangram"] = True
 
     if st.session_state.get("show_pangram"):
-        all_pangrams = [w for w in st.session_state.get("valid_words", []) if is_pangram(w, letters_set)]
+        all_pangrams = st.session_state.get("pangrams_all", [])
         if all_pangrams:
             st.success(f"Pangrams ({len(all_pangrams)}): {', '.join(all_pangrams)}")
         else: